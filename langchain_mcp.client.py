@@ -1,4 +1,6 @@
 import asyncio
+import logging
+import anyio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from IPython.display import display, Markdown
@@ -29,40 +31,150 @@ server_params = StdioServerParameters(
     # Make sure to update to the full absolute path to your math_server.py file
     args=["math_server.py"],
 )
+# The MCP sessions, their tools and the agent are shared by all callers, so a question
+# doesn't pay for the initialize/tools/list handshake or for spawning math_server.py.
+# They are reference counted and closed once nobody has used them for _IDLE_CLOSE_DELAY seconds.
+_IDLE_CLOSE_DELAY = 30.0
+_AGENT = None
+_AGENT_LOCK = asyncio.Lock()
+_AGENT_REFS = 0
+_idle_close_handle = None
+_sessions_task = None
+_sessions_stop = None
+_sessions_ready = None
+_session_tasks = set()  # every holder task, kept referenced until it has finished
+# Errors from ainvoke() that mean the sessions behind the agent's tools are gone.
+_SESSION_LOST_ERRORS = (ConnectionError, anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)
+
+
+async def _hold_sessions(ready, stop):
+    # The sessions are entered and exited in this one task, as anyio-based transports require.
+    global _AGENT
+    client = MultiServerMCPClient({
+        "weather": {
+            "url": "http://localhost:8000/sse",
+            "transport": "sse",
+        },
+        "math": {
+            "command": "python",
+            # Make sure to update to the full absolute path to your math_server.py file
+            "args": ["math_server.py"],
+            "transport": "stdio",
+        },
+    })
+    try:
+        # Collect tools from all servers
+        async with client.session("weather") as weather_session, client.session("math") as math_session:
+            weather_tool = await load_mcp_tools(weather_session)
+            math_tool = await load_mcp_tools(math_session)
+            all_tools = weather_tool + math_tool
+            agent = create_agent(model, all_tools)
+            if _sessions_task is asyncio.current_task():
+                _AGENT = agent
+            ready.set_result(agent)
+            await stop.wait()
+    except Exception as exc:
+        if ready.done():
+            raise  # sessions died while in use; surface it instead of dropping it
+        ready.set_exception(exc)
+    finally:
+        if not ready.done():
+            ready.cancel()
+        # If this task still backs the shared agent, invalidate it so the next caller rebuilds.
+        if _sessions_task is asyncio.current_task():
+            _forget_sessions()
+
+
+async def _acquire_agent():
+    global _AGENT_REFS, _idle_close_handle
+    async with _AGENT_LOCK:
+        if _idle_close_handle is not None:
+            _idle_close_handle.cancel()
+            _idle_close_handle = None
+        agent = _AGENT if _AGENT is not None else await _start_sessions()
+        _AGENT_REFS += 1
+        return agent
+
+
+def _release_agent():
+    global _AGENT_REFS, _idle_close_handle
+    _AGENT_REFS -= 1
+    if _AGENT_REFS == 0 and _AGENT is not None:
+        _idle_close_handle = asyncio.get_running_loop().call_later(_IDLE_CLOSE_DELAY, _stop_sessions)
+
+
+async def _start_sessions():
+    global _sessions_task, _sessions_stop, _sessions_ready
+    if _sessions_ready is None:
+        loop = asyncio.get_running_loop()
+        _sessions_ready = loop.create_future()
+        _sessions_stop = asyncio.Event()
+        _sessions_task = loop.create_task(_hold_sessions(_sessions_ready, _sessions_stop))
+        _session_tasks.add(_sessions_task)
+        _sessions_task.add_done_callback(_session_task_done)
+    # Shielded so a cancelled caller doesn't tear down the setup other callers will use.
+    return await asyncio.shield(_sessions_ready)
+
+
+def _stop_sessions():
+    global _idle_close_handle
+    if _idle_close_handle is not None:
+        _idle_close_handle.cancel()
+        _idle_close_handle = None
+    if _sessions_stop is not None:
+        _sessions_stop.set()
+    _forget_sessions()
+
+
+def _forget_sessions():
+    global _AGENT, _sessions_task, _sessions_stop, _sessions_ready
+    _AGENT = None
+    _sessions_task = _sessions_stop = _sessions_ready = None
+
+
+def _session_task_done(task):
+    _session_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.getLogger(__name__).error("MCP sessions closed with an error", exc_info=task.exception())
+
+
+async def _close_agent():
+    _stop_sessions()
+    if _session_tasks:
+        await asyncio.wait(set(_session_tasks))
+
+
 async def run_app(user_question):
-    
-    client = MultiServerMCPClient({"weather": {
-                "url": "http://localhost:8000/sse",
-                "transport": "sse",
-            },
-    "math": {
-        "command": "python",
-        # Make sure to update to the full absolute path to your math_server.py file
-        "args": ["math_server.py"],
-        "transport": "stdio",
-    }
-})
-
-    all_tools = []
-
-    # Collect tools from all servers
-    #for name in ["math", "weather"]:
-    async with client.session("weather") as weather_session,client.session("math") as math_session:
-        weather_tool = await load_mcp_tools(weather_session)
-        math_tool = await load_mcp_tools(math_session)
-        all_tools = weather_tool + math_tool
-            # Load tools from the MCP client
-        agent = create_agent(model, all_tools)
+    agent = await _acquire_agent()
+    try:
         agent_response = await agent.ainvoke({"messages": user_question})
-       
-    
+    except _SESSION_LOST_ERRORS:
+        if _AGENT is agent:
+            _stop_sessions()
+        raise
+    finally:
+        _release_agent()
     return agent_response['messages'][-1].content
+
+
+async def main(user_question):
+    try:
+        return await run_app(user_question)
+    finally:
+        await _close_agent()
+
+
 if __name__ == "__main__":
     #user_question = "what is the weather in california?"
     user_question = "what's (3 + 5) x 12?"
     #user_question = "what's the weather in seattle?"
     #user_question = "what's the weather in NYC?"
-    response = asyncio.run(run_app(user_question=user_question))
+    try:
+        import uvloop  # optional: faster event loop for small-frame RPC
+    except ImportError:
+        response = asyncio.run(main(user_question=user_question))
+    else:
+        response = uvloop.run(main(user_question=user_question))
     print(response)
         
         
@@ -9,13 +9,145 @@ This client demonstrates connect, send, receive, heartbeat, and graceful shutdow
 """
 
 import asyncio
-import json
+import contextlib
+import itertools
+import socket
 import struct
-from typing import Any, Dict, Optional
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import orjson
 
 DEFAULT_HOST = "127.0.0.1"
 DEFAULT_PORT = 9000
 LENGTH_PREFIX = ">I"  # big-endian unsigned int (4 bytes)
+_LENGTH = struct.Struct(LENGTH_PREFIX)  # compiled once; pack/unpack skip the format parse
+_PACK_LENGTH = _LENGTH.pack
+_UNPACK_LENGTH_FROM = _LENGTH.unpack_from
+PREFIX_SIZE = _LENGTH.size
+RECV_BUFFER_SIZE = 65536  # receive buffer size; grows temporarily for larger frames
+MIN_RECV_SIZE = 4096  # compact the receive buffer rather than recv into less free space than this
+
+# Heartbeats are constant apart from the msg_id, which is written as a fixed-width
+# (space-padded) field so the whole frame, length prefix included, is prebuilt once.
+_HEARTBEAT_ID_WIDTH = 10
+_HEARTBEAT_BODY_HEAD = b'{"type":"heartbeat","msg_id":'
+_HEARTBEAT_FRAME_HEAD = (
+    _PACK_LENGTH(len(_HEARTBEAT_BODY_HEAD) + _HEARTBEAT_ID_WIDTH + 1) + _HEARTBEAT_BODY_HEAD
+)
+_HEARTBEAT_ID_FORMAT = b"%" + str(_HEARTBEAT_ID_WIDTH).encode() + b"d}"
+
+
+class MCPProtocol(asyncio.BufferedProtocol):
+    """
+    Frame reader for the length-prefixed JSON stream.
+    The event loop receives into the free tail of a reusable buffer, and every complete frame
+    in it is decoded in place, so a burst of small frames costs one recv instead of two per frame.
+    """
+
+    def __init__(self, client: "MCPClient"):
+        self._client = client
+        self._transport: Optional[asyncio.Transport] = None
+        self._buf = bytearray(RECV_BUFFER_SIZE)
+        self._view = memoryview(self._buf)
+        self._start = 0  # offset of the first unparsed byte
+        self._end = 0  # offset just past the last received byte
+        self._paused = False
+        self._drain_waiters: Deque[asyncio.Future] = deque()
+        self._loop = asyncio.get_running_loop()
+        self._closed: asyncio.Future = self._loop.create_future()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport  # type: ignore[assignment]
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+        buf, view, end = self._buf, self._view, self._end
+        pos = self._start
+        needed = PREFIX_SIZE
+        # Dispatch every complete frame before returning to the loop: completing a response
+        # future only schedules its waiter, so a burst of replies costs one loop iteration.
+        loads, handle_message = orjson.loads, self._client._handle_message
+        while end - pos >= PREFIX_SIZE:
+            (length,) = _UNPACK_LENGTH_FROM(buf, pos)
+            if length == 0:
+                self._transport.close()
+                return
+            needed = PREFIX_SIZE + length
+            if end - pos < needed:
+                break
+            # Decode straight out of the receive buffer.
+            try:
+                msg = loads(view[pos + PREFIX_SIZE:pos + needed])
+            except orjson.JSONDecodeError:
+                self._transport.close()
+                return
+            pos += needed
+            needed = PREFIX_SIZE
+            handle_message(msg)
+
+        if pos == end:
+            self._start = self._end = 0
+            if len(buf) > RECV_BUFFER_SIZE:
+                # Don't keep a buffer sized for one large response (e.g. tools/list) alive forever.
+                view.release()
+                self._buf = bytearray(RECV_BUFFER_SIZE)
+                self._view = memoryview(self._buf)
+            return
+        self._start = pos
+        if len(buf) - pos < needed or (pos and len(buf) - end < MIN_RECV_SIZE):
+            # Partial frame doesn't fit in what's left, or the next recv would be tiny:
+            # move it to the front, growing if needed.
+            tail = end - pos
+            if needed > len(buf):
+                new_buf = bytearray(max(needed, 2 * len(buf)))
+                new_buf[:tail] = view[pos:end]
+                view.release()
+                self._buf = new_buf
+                self._view = memoryview(new_buf)
+            else:
+                buf[:tail] = buf[pos:end]
+            self._start = 0
+            self._end = tail
+
+    def eof_received(self) -> Optional[bool]:
+        return None  # close the transport
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._client._connection_lost()
+        if not self._closed.done():
+            self._closed.set_result(None)
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionResetError("Connection lost"))
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def drain(self) -> None:
+        if self._transport is None or self._transport.is_closing():
+            raise ConnectionResetError("Connection lost")
+        if not self._paused:
+            return
+        # Every writer that hits the high-water mark gets its own waiter (as in FlowControlMixin).
+        waiter = self._loop.create_future()
+        self._drain_waiters.append(waiter)
+        try:
+            await waiter
+        finally:
+            self._drain_waiters.remove(waiter)
+
+    async def wait_closed(self) -> None:
+        await self._closed
 
 
 class MCPClient:
@@ -23,31 +155,39 @@ class MCPClient:
         self.host = host
         self.port = port
         self.heartbeat_interval = heartbeat_interval
-        self._reader: Optional[asyncio.StreamReader] = None
-        self._writer: Optional[asyncio.StreamWriter] = None
-        self._receive_task: Optional[asyncio.Task] = None
+        self._transport: Optional[asyncio.Transport] = None
+        self._protocol: Optional[MCPProtocol] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._heartbeat_task: Optional[asyncio.Task] = None
-        self._response_futures: Dict[str, asyncio.Future] = {}
-        self._msg_id_counter = 0
+        self._response_futures: Dict[int, asyncio.Future] = {}
+        self._next_msg_id = itertools.count(1).__next__
         self._closed = False
 
     async def connect(self, timeout: float = 5.0) -> None:
-        if self._reader and not self._reader.at_eof():
+        if self.is_connected():
             return
-        self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), timeout)
-        self._receive_task = asyncio.create_task(self._reader_loop())
-        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        self._loop = asyncio.get_running_loop()
+        self._transport, self._protocol = await asyncio.wait_for(
+            self._loop.create_connection(lambda: MCPProtocol(self), self.host, self.port), timeout
+        )
+        # Small RPC frames: send immediately, and make drain() wait until the kernel has the bytes.
+        sock = self._transport.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._transport.set_write_buffer_limits(high=0)
+        self._heartbeat_task = self._loop.create_task(self._heartbeat_loop())
+
+    def is_connected(self) -> bool:
+        return not self._closed and self._transport is not None and not self._transport.is_closing()
 
     async def close(self) -> None:
         self._closed = True
         if self._heartbeat_task:
             self._heartbeat_task.cancel()
-        if self._receive_task:
-            self._receive_task.cancel()
-        if self._writer:
+        if self._transport:
             try:
-                self._writer.close()
-                await self._writer.wait_closed()
+                self._transport.close()
+                await self._protocol.wait_closed()
             except Exception:
                 pass
         # Fail any pending futures
@@ -59,19 +199,20 @@ class MCPClient:
         """
         Send a JSON request and wait for a response associated with the generated message id.
         The server is expected to echo back a response with {"reply_to": <msg_id>, ...}.
+        The payload dict is sent as-is (with "type" and "msg_id" filled in), so callers
+        must not reuse it for another request.
         """
         if self._closed:
             raise ConnectionError("Client is closed")
-        if self._writer is None:
+        if self._transport is None:
             await self.connect()
 
         msg_id = self._next_msg_id()
-        payload = dict(payload)  # copy
         payload.setdefault("type", "request")
         payload["msg_id"] = msg_id
 
-        fut: asyncio.Future = asyncio.get_event_loop().create_future()
-        self._response_futures[str(msg_id)] = fut
+        fut: asyncio.Future = self._loop.create_future()
+        self._response_futures[msg_id] = fut
 
         await self._write_message(payload)
 
@@ -79,68 +220,32 @@ class MCPClient:
             response = await asyncio.wait_for(fut, timeout)
             return response
         finally:
-            self._response_futures.pop(str(msg_id), None)
+            self._response_futures.pop(msg_id, None)
 
     async def _write_message(self, obj: Dict[str, Any]) -> None:
-        if self._writer is None:
+        if self._transport is None:
             raise ConnectionError("Not connected")
-        data = json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
-        prefix = struct.pack(LENGTH_PREFIX, len(data))
-        self._writer.write(prefix + data)
-        await self._writer.drain()
-
-    async def _reader_loop(self) -> None:
-        assert self._reader is not None
-        try:
-            while not self._reader.at_eof():
-                msg = await self._read_message()
-                if msg is None:
-                    break
-                await self._handle_message(msg)
-        except asyncio.CancelledError:
-            pass
-        except Exception:
-            # In a real client you'd add logging and reconnection logic here.
-            pass
-        finally:
-            # Fail any outstanding futures
-            for fut in self._response_futures.values():
-                if not fut.done():
-                    fut.set_exception(ConnectionError("Connection lost"))
- 
-    async def _read_message(self) -> Optional[Dict[str, Any]]:
-        assert self._reader is not None
-        # Read length prefix
-        prefix_bytes = await self._read_exact(4)
-        if prefix_bytes is None:
-            return None
-        (length,) = struct.unpack(LENGTH_PREFIX, prefix_bytes)
-        if length == 0:
-            return None
-        body = await self._read_exact(length)
-        if body is None:
-            return None
-        try:
-            return json.loads(body.decode("utf-8"))
-        except json.JSONDecodeError:
-            return None
+        data = orjson.dumps(obj)
+        prefix = _PACK_LENGTH(len(data))
+        # Hand both buffers to the transport; on 3.12+ this is a single sendmsg() with no concat.
+        self._transport.writelines((prefix, data))
+        await self._protocol.drain()
 
-    async def _read_exact(self, n: int) -> Optional[bytes]:
-        assert self._reader is not None
-        try:
-            data = await self._reader.readexactly(n)
-            return data
-        except (asyncio.IncompleteReadError, ConnectionResetError):
-            return None
+    def _connection_lost(self) -> None:
+        # Fail any outstanding futures
+        for fut in self._response_futures.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("Connection lost"))
 
-    async def _handle_message(self, msg: Dict[str, Any]) -> None:
+    def _handle_message(self, msg: Dict[str, Any]) -> None:
         # Simple handling: if message has "reply_to", complete corresponding future.
         reply_to = msg.get("reply_to")
         if reply_to is not None:
-            fut = self._response_futures.get(str(reply_to))
+            fut = self._response_futures.get(reply_to)
             if fut and not fut.done():
                 fut.set_result(msg)
-                return
+            # Replies nobody waits for (heartbeats, timed-out requests) are dropped.
+            return
         # Otherwise, handle notifications or other types (demo: print).
         # In a library you'd expose a callback or queue to the user.
         print("Notification:", msg)
@@ -150,16 +255,74 @@ class MCPClient:
             while not self._closed:
                 await asyncio.sleep(self.heartbeat_interval)
                 try:
-                    await self.send_request({"type": "heartbeat"}, timeout=3.0)
+                    # Fire-and-forget: heartbeats are sent as notifications, no future is registered.
+                    self._transport.writelines((_HEARTBEAT_FRAME_HEAD, _HEARTBEAT_ID_FORMAT % self._next_msg_id()))
+                    await self._protocol.drain()
                 except Exception:
                     # ignore heartbeat failures here; real client could reconnect
                     pass
         except asyncio.CancelledError:
             pass
 
-    def _next_msg_id(self) -> int:
-        self._msg_id_counter += 1
-        return self._msg_id_counter
+
+class MCPConnectionPool:
+    """
+    Shares up to max_size connected MCPClients between concurrent callers.
+    Checking out an idle client never awaits. When all of them are in use, up to burst_limit
+    clients in total may be open at once; the extra ones are closed when returned.
+    Callers only wait once burst_limit clients are checked out.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        max_size: int = 8,
+        burst_limit: Optional[int] = None,
+        heartbeat_interval: float = 10.0,
+    ):
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.burst_limit = max(burst_limit or max_size, max_size)
+        self.heartbeat_interval = heartbeat_interval
+        self._idle: Deque[MCPClient] = deque()
+        self._slots = asyncio.Semaphore(self.burst_limit)
+        self._closed = False
+
+    @contextlib.asynccontextmanager
+    async def get_connection(self) -> AsyncIterator[MCPClient]:
+        if self._closed:
+            raise ConnectionError("Pool is closed")
+        async with self._slots:
+            if self._closed:
+                raise ConnectionError("Pool is closed")
+            client = await self._checkout()
+            try:
+                yield client
+            finally:
+                # Keep up to max_size live clients; close burst extras, dead ones, and
+                # anything returned after the pool was closed.
+                if not self._closed and client.is_connected() and len(self._idle) < self.max_size:
+                    self._idle.append(client)
+                else:
+                    await client.close()
+
+    async def _checkout(self) -> MCPClient:
+        while self._idle:
+            client = self._idle.pop()
+            if client.is_connected():
+                return client
+            await client.close()
+        client = MCPClient(host=self.host, port=self.port, heartbeat_interval=self.heartbeat_interval)
+        await client.connect()
+        return client
+
+    async def close(self) -> None:
+        # Checked-out clients are closed by get_connection() when they come back.
+        self._closed = True
+        while self._idle:
+            await self._idle.pop().close()
 
 
 async def main() -> None:
@@ -187,4 +350,9 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        import uvloop  # optional: faster event loop for small-frame RPC
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
\ No newline at end of file